@@ -0,0 +1,296 @@
+"""
+Declarative, single-pass aggregation over streams of JObjs.
+
+A `Query` groups objects by dotted-path keys and computes aggregates for
+each group::
+
+    query = Query(
+        group_by="org",
+        where=lambda pr: pr["pull.merged"],
+        prs=Count(),
+        lines=Sum(lambda pr: pr["pull.additions"] + pr["pull.deletions"]),
+        age=Median("age"),
+    )
+    for org, results in sorted(query.run(pulls).items()):
+        print(org, results["prs"], results["lines"], results["age"])
+
+Keys can be dotted paths or functions of the object.  The stream is read
+once, so it can be a generator straight from `paginated_get`.  Partitions
+(for example, one per repo) can be aggregated separately, in parallel
+threads if you like, and merged.
+"""
+import itertools
+from multiprocessing.pool import ThreadPool
+
+from .durations import QuantileSketch
+from .jreport import JObj
+
+
+def get_value(obj, key):
+    """Get `key` from `obj`: a dotted path, or a function of the object."""
+    if callable(key):
+        return key(obj)
+    if not isinstance(obj, JObj):
+        obj = JObj(obj)
+    return obj[key]
+
+
+class Each(object):
+    """
+    A group_by key for a list value: the object is counted in the group for
+    each of the values.  Group by `Each("labels")` to total up by label.
+    """
+    def __init__(self, key):
+        self.key = key
+
+    def __repr__(self):
+        return u"jreport.{cls}({key!r})".format(
+            cls=self.__class__.__name__, key=self.key,
+        )
+
+
+class Aggregate(object):
+    """
+    The base class for aggregates.
+
+    An aggregate makes an accumulator with `start`, updates it with `add`,
+    combines two accumulators with `merge`, and produces its result from an
+    accumulator with `finish`.
+    """
+    def __init__(self, key=None):
+        self.key = key
+
+    def __repr__(self):
+        return u"jreport.{cls}({key!r})".format(
+            cls=self.__class__.__name__, key=self.key,
+        )
+
+    def start(self):
+        raise NotImplementedError
+
+    def add(self, acc, obj):
+        raise NotImplementedError
+
+    def merge(self, acc, other):
+        raise NotImplementedError
+
+    def finish(self, acc):
+        return acc
+
+
+class Count(Aggregate):
+    """The number of objects."""
+    def start(self):
+        return 0
+
+    def add(self, acc, obj):
+        return acc + 1
+
+    def merge(self, acc, other):
+        return acc + other
+
+
+class Sum(Aggregate):
+    """The total of the `key` values."""
+    def start(self):
+        return 0
+
+    def add(self, acc, obj):
+        return acc + get_value(obj, self.key)
+
+    def merge(self, acc, other):
+        return acc + other
+
+
+class Quantile(Aggregate):
+    """
+    The approximate `q` quantile of the `key` values, or None if there are
+    none.  Values that are timedeltas are handled in seconds.
+    """
+    def __init__(self, key, q):
+        super(Quantile, self).__init__(key)
+        self.q = q
+
+    def __repr__(self):
+        return u"jreport.{cls}({key!r}, {q!r})".format(
+            cls=self.__class__.__name__, key=self.key, q=self.q,
+        )
+
+    def start(self):
+        return QuantileSketch()
+
+    def add(self, acc, obj):
+        value = get_value(obj, self.key)
+        if hasattr(value, "total_seconds"):
+            value = value.total_seconds()
+        acc.add(value)
+        return acc
+
+    def merge(self, acc, other):
+        return acc.merge(other)
+
+    def finish(self, acc):
+        return acc.quantile(self.q)
+
+
+class Median(Quantile):
+    """The approximate median of the `key` values."""
+    def __init__(self, key):
+        super(Median, self).__init__(key, 0.5)
+
+    def __repr__(self):
+        return u"jreport.{cls}({key!r})".format(
+            cls=self.__class__.__name__, key=self.key,
+        )
+
+
+class Histogram(Aggregate):
+    """
+    Counts of the `key` values, as a dict.
+
+    If `buckets` is given, it's a list of (label, low, high) triples, and
+    values are counted under the label of the bucket with low <= value < high,
+    or under "unknown".  Otherwise each distinct value is counted.  Values
+    of None aren't counted.
+    """
+    def __init__(self, key, buckets=None):
+        super(Histogram, self).__init__(key)
+        self.buckets = buckets
+
+    def start(self):
+        return {}
+
+    def bucket(self, value):
+        if self.buckets is None:
+            return value
+        for label, low, high in self.buckets:
+            if low <= value < high:
+                return label
+        return "unknown"
+
+    def add(self, acc, obj):
+        value = get_value(obj, self.key)
+        if value is not None:
+            label = self.bucket(value)
+            acc[label] = acc.get(label, 0) + 1
+        return acc
+
+    def merge(self, acc, other):
+        for label, count in other.items():
+            acc[label] = acc.get(label, 0) + count
+        return acc
+
+
+class Query(object):
+    """
+    Group objects by the `group_by` keys, and compute the named aggregates
+    for each group.
+
+    `group_by` is a single key, a list of keys, or empty (anything false)
+    for no grouping.  Keys are dotted paths, functions, or `Each` for list
+    values.  `where` is an optional function to choose which objects to
+    include.
+    """
+    def __init__(self, group_by=(), where=None, **aggregates):
+        if not group_by:
+            self.group_by = []
+            self.single_key = False
+        elif isinstance(group_by, (list, tuple)):
+            self.group_by = list(group_by)
+            self.single_key = False
+        else:
+            self.group_by = [group_by]
+            self.single_key = True
+        self.where = where
+        self.aggregates = aggregates
+
+    def __repr__(self):
+        return u"jreport.{cls}({group_by!r}, {aggs!r})".format(
+            cls=self.__class__.__name__, group_by=self.group_by,
+            aggs=sorted(self.aggregates),
+        )
+
+    def _groups(self, obj):
+        values = []
+        for key in self.group_by:
+            if isinstance(key, Each):
+                value = get_value(obj, key.key)
+                if not isinstance(value, (list, tuple, set)):
+                    raise TypeError(
+                        "{key!r} needs a list, not {value!r}".format(key=key, value=value)
+                    )
+                values.append(value)
+            else:
+                values.append([get_value(obj, key)])
+        for group in itertools.product(*values):
+            yield group[0] if self.single_key else group
+
+    def partial(self, objs):
+        """
+        Aggregate `objs` into a dict mapping groups to accumulators, which
+        can be combined with `merge` and completed with `finish`.
+        """
+        groups = {}
+        aggregates = list(self.aggregates.items())
+        for obj in objs:
+            if self.where and not self.where(obj):
+                continue
+            for group in self._groups(obj):
+                accs = groups.get(group)
+                if accs is None:
+                    accs = groups[group] = {name: agg.start() for name, agg in aggregates}
+                for name, agg in aggregates:
+                    accs[name] = agg.add(accs[name], obj)
+        return groups
+
+    def merge(self, partials):
+        """
+        Combine a number of results from `partial` into one.  The partials
+        aren't changed, so they can be merged again in other ways.
+        """
+        merged = {}
+        for groups in partials:
+            for group, accs in groups.items():
+                into = merged.get(group)
+                if into is None:
+                    into = merged[group] = {
+                        name: agg.start() for name, agg in self.aggregates.items()
+                    }
+                for name, agg in self.aggregates.items():
+                    into[name] = agg.merge(into[name], accs[name])
+        return merged
+
+    def finish(self, groups):
+        """
+        Produce a dict mapping each group to a dict of aggregate results.
+        With no `group_by` keys, just the dict of aggregate results.
+        """
+        results = {
+            group: {name: agg.finish(accs[name]) for name, agg in self.aggregates.items()}
+            for group, accs in groups.items()
+        }
+        if not self.group_by:
+            return results.get((), {
+                name: agg.finish(agg.start()) for name, agg in self.aggregates.items()
+            })
+        return results
+
+    def run(self, objs):
+        """Aggregate the stream `objs` in one pass."""
+        return self.finish(self.partial(objs))
+
+    def run_partitions(self, partitions, threads=None):
+        """
+        Aggregate each of `partitions` (iterables of objects) separately,
+        and merge the results.  If `threads` is given, that many partitions
+        are read at once, which helps when they come from the network.
+        """
+        if threads:
+            pool = ThreadPool(threads)
+            try:
+                partials = pool.map(self.partial, partitions)
+            finally:
+                pool.close()
+        else:
+            partials = [self.partial(p) for p in partitions]
+        return self.finish(self.merge(partials))
@@ -0,0 +1,127 @@
+"""
+An in-process cache of JSON API objects, keyed by URL.
+
+Reports often look up the same object more than once: a pull request can
+appear in several listings, and report variants re-load the same details.
+The cache is bounded by the total size of the JSON it holds, evicting the
+least recently used objects first.
+"""
+from __future__ import print_function
+
+import collections
+import json
+import sys
+
+from .snapshot import http_get
+
+
+class ObjectCache(object):
+    """
+    A least-recently-used cache of JSON objects, weighted by payload size.
+
+    Objects are held as JSON text and decoded on each hit, so callers get
+    their own copy and can modify it freely.
+    """
+    def __init__(self, max_bytes=50 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return u"jreport.{cls}(max_bytes={max_bytes!r})".format(
+            cls=self.__class__.__name__, max_bytes=self.max_bytes,
+        )
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, url):
+        return str(url) in self.entries
+
+    def get(self, url):
+        """Return the object cached for `url`, or None."""
+        url = str(url)
+        text = self.entries.pop(url, None)
+        if text is None:
+            self.misses += 1
+            return None
+        # Re-insert to mark it as most recently used.
+        self.entries[url] = text
+        self.hits += 1
+        return json.loads(text)
+
+    def put(self, url, obj):
+        url = str(url)
+        old = self.entries.pop(url, None)
+        if old is not None:
+            self.size -= len(old)
+        text = json.dumps(obj)
+        if len(text) > self.max_bytes:
+            return
+        self.entries[url] = text
+        self.size += len(text)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+    def stats(self):
+        return (
+            "{hits} hits, {misses} misses ({rate:.1%}), {evictions} evictions, "
+            "{num} objects in {size} bytes of {max_bytes}".format(
+                hits=self.hits, misses=self.misses, rate=self.hit_rate,
+                evictions=self.evictions, num=len(self.entries), size=self.size,
+                max_bytes=self.max_bytes,
+            )
+        )
+
+    def print_stats(self, stream=sys.stderr):
+        print("object cache: " + self.stats(), file=stream)
+
+
+# The cache shared by everything in this process.
+object_cache = ObjectCache()
+
+
+def cache_key(url, auth=None):
+    """
+    The cache key for `url` fetched with `auth`, or None if it can't be cached.
+
+    Objects fetched with credentials are only shared with callers using the
+    same username.  Other kinds of auth aren't cached.
+    """
+    if not auth:
+        return str(url)
+    if isinstance(auth, (tuple, list)):
+        return "{url} as {user}".format(url=url, user=auth[0])
+    return None
+
+
+def get_json(url, auth=None, use_cache=True, **kwargs):
+    """
+    Get the JSON object at `url`, using `object_cache` if `use_cache`.
+
+    Only successful responses are cached.
+    """
+    key = cache_key(url, auth) if use_cache else None
+    result = None
+    if key is not None:
+        result = object_cache.get(key)
+    if result is None:
+        resp = http_get(url, auth=auth, **kwargs)
+        result = resp.json()
+        if resp.ok and key is not None:
+            object_cache.put(key, result)
+    return result
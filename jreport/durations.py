@@ -0,0 +1,325 @@
+"""
+Mergeable quantile sketches for summarizing durations.
+
+A `QuantileSketch` keeps a bounded number of samples no matter how many
+values are added, and can answer quantile queries (p50, p90, p99) with a
+small, bounded rank error.  Sketches serialize to plain dicts, so daily
+or per-repo results can be stored and merged later into trend reports.
+"""
+import collections
+import json
+import math
+
+
+class QuantileSketch(object):
+    """
+    A KLL quantile sketch.
+
+    Values are kept in a stack of compactors.  An item at level `h` stands
+    for 2**h original values.  When a level fills up, it is sorted and every
+    other item is promoted to the next level, so memory stays around `3k`
+    items regardless of how many values are added.
+    """
+    def __init__(self, k=200):
+        self.k = k
+        self.compactors = [[]]
+        self.count = 0
+        self.min = None
+        self.max = None
+        # Alternate which half of a compactor is promoted, so that
+        # compaction doesn't consistently bias toward small or large values.
+        self._offset = 0
+
+    def __repr__(self):
+        return u"jreport.{cls}(k={k!r}, count={count!r})".format(
+            cls=self.__class__.__name__, k=self.k, count=self.count,
+        )
+
+    def __len__(self):
+        return self.count
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2.0 / 3.0) ** depth)) + 1
+
+    def _size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def _max_size(self):
+        return sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def add(self, value):
+        """Add one value to the sketch."""
+        self.compactors[0].append(value)
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def update(self, values):
+        """Add all the values from an iterable."""
+        for value in values:
+            self.add(value)
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            items = self.compactors[h]
+            if len(items) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.compactors):
+                self.compactors.append([])
+            items.sort()
+            # An odd item out stays at this level.
+            keep = [items.pop()] if len(items) % 2 else []
+            self.compactors[h + 1].extend(items[self._offset::2])
+            self._offset = 1 - self._offset
+            self.compactors[h] = keep
+            if self._size() < self._max_size():
+                break
+
+    def merge(self, other):
+        """Fold `other` into this sketch.  Returns self."""
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for h, items in enumerate(other.compactors):
+            self.compactors[h].extend(items)
+        self.count += other.count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+        while self._size() >= self._max_size():
+            self._compress()
+        return self
+
+    def quantile(self, q):
+        """Return the approximate `q` quantile (0 <= q <= 1), or None if empty."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs):
+        """
+        Return a list of approximate quantiles, one for each of `qs`.
+
+        Until the sketch has compacted anything, quantiles are exact and
+        interpolated, so the median of [1, 2, 3, 4] is 2.5.  After that, they
+        are items from the sketch, within its rank error.
+        """
+        if not self.count:
+            return [None] * len(qs)
+        if len(self.compactors) == 1:
+            return [self._exact_quantile(q) for q in qs]
+        weighted = sorted(
+            (item, 2 ** h)
+            for h, items in enumerate(self.compactors)
+            for item in items
+        )
+        total = sum(w for _, w in weighted)
+        results = []
+        for q in qs:
+            if q <= 0:
+                results.append(self.min)
+                continue
+            if q >= 1:
+                results.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            for item, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    break
+            results.append(item)
+        return results
+
+    def _exact_quantile(self, q):
+        # Nothing has been compacted yet, so every value is still here.
+        # Interpolate between neighbors the way statistics.median does.
+        items = sorted(self.compactors[0])
+        pos = (len(items) - 1) * min(max(q, 0), 1)
+        lo = int(math.floor(pos))
+        frac = pos - lo
+        if not frac:
+            return items[lo]
+        return items[lo] + (items[lo + 1] - items[lo]) * frac
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def to_dict(self):
+        """Produce a JSON- or YAML-friendly representation of the sketch."""
+        return {
+            "k": self.k,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "compactors": [list(c) for c in self.compactors],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(k=data["k"])
+        sketch.count = data["count"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        sketch.compactors = [list(c) for c in data["compactors"]] or [[]]
+        return sketch
+
+
+class DurationSketches(object):
+    """
+    Quantile sketches of pull request durations, split into categories.
+
+    This has an `append` method, so it can stand in for one of the lists
+    that `get_duration_data` fills: each appended issue has its "duration"
+    recorded in seconds, under the category chosen by `category_fn`.
+    """
+    def __init__(self, category_fn=None, k=200):
+        self.category_fn = category_fn or (lambda issue: "all")
+        self.k = k
+        self.sketches = collections.defaultdict(self._new_sketch)
+
+    def __repr__(self):
+        return u"jreport.{cls}({cats!r})".format(
+            cls=self.__class__.__name__, cats=sorted(self.sketches),
+        )
+
+    def _new_sketch(self):
+        return QuantileSketch(k=self.k)
+
+    def __getitem__(self, category):
+        return self.sketches[category]
+
+    def __contains__(self, category):
+        return category in self.sketches
+
+    def categories(self):
+        return sorted(self.sketches)
+
+    def append(self, issue):
+        seconds = issue['duration'].total_seconds()
+        self.sketches[self.category_fn(issue)].add(seconds)
+
+    def merge(self, other):
+        """Fold `other` into these sketches.  Returns self."""
+        for category, sketch in other.sketches.items():
+            self.sketches[category].merge(sketch)
+        return self
+
+    def to_dict(self):
+        return {
+            "k": self.k,
+            "sketches": {cat: s.to_dict() for cat, s in self.sketches.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, category_fn=None):
+        sketches = cls(category_fn, k=data["k"])
+        for category, sketch_data in data["sketches"].items():
+            sketches.sketches[category] = QuantileSketch.from_dict(sketch_data)
+        return sketches
+
+    def dump(self, f):
+        json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, f, category_fn=None):
+        return cls.from_dict(json.load(f), category_fn)
+
+
+# Saved durations can only be merged if these metadata values agree.
+MERGEABLE_METADATA = ("since_days", "org")
+
+
+def new_duration_sketches(category_fn=None):
+    """
+    Make the dict of dicts of `DurationSketches` that `get_duration_data`
+    fills in, organized by state and position.
+    """
+    return {
+        state: {
+            position: DurationSketches(category_fn)
+            for position in ("internal", "external")
+        }
+        for state in ("open", "closed")
+    }
+
+
+def save_duration_sketches(filename, durations, metadata):
+    """
+    Save `durations` (from `new_duration_sketches`) to `filename`.
+
+    `metadata` describes the runs the data came from: "since_days", "since",
+    "dates", "repos", "runs" (a list of [date, repo] pairs), "org", and
+    "categories".
+    """
+    saved = {
+        "metadata": metadata,
+        "durations": {
+            state: {position: sketches.to_dict() for position, sketches in positions.items()}
+            for state, positions in durations.items()
+        },
+    }
+    with open(filename, "w") as f:
+        json.dump(saved, f)
+
+
+def load_duration_sketches(filenames, category_fn=None):
+    """
+    Read and merge durations saved with `save_duration_sketches`.
+
+    Returns the durations, and metadata combined from all the files: all
+    their dates, repos, runs and categories, and the earliest "since".
+    Raises ValueError if the files weren't made with the same settings, or
+    if two files have data for the same repo on the same day.
+
+    Files for different repos merge into disjoint populations.  Files from
+    different days don't: a pull request open on both days, or closed within
+    both days' "since" windows, is counted once per day.  Merging days gives
+    a duration distribution over the days' observations, not over distinct
+    pull requests.
+    """
+    durations = new_duration_sketches(category_fn)
+    metadata = None
+    for filename in filenames:
+        with open(filename) as f:
+            saved = json.load(f)
+        file_metadata = dict(saved["metadata"])
+        file_metadata.setdefault("runs", [
+            [day, repo] for day in file_metadata["dates"] for repo in file_metadata["repos"]
+        ])
+        if metadata is None:
+            metadata = file_metadata
+        else:
+            for key in MERGEABLE_METADATA:
+                if file_metadata[key] != metadata[key]:
+                    raise ValueError(
+                        "Can't merge {filename}: its {key} is {theirs!r}, not {ours!r}".format(
+                            filename=filename, key=key,
+                            theirs=file_metadata[key], ours=metadata[key],
+                        )
+                    )
+            runs = set(tuple(run) for run in metadata["runs"])
+            overlap = runs & set(tuple(run) for run in file_metadata["runs"])
+            if overlap:
+                raise ValueError(
+                    "Can't merge {filename}: it repeats {day} {repo}".format(
+                        filename=filename, day=min(overlap)[0], repo=min(overlap)[1],
+                    )
+                )
+            metadata["runs"] = sorted(runs | set(tuple(run) for run in file_metadata["runs"]))
+            metadata["dates"] = sorted(set(metadata["dates"]) | set(file_metadata["dates"]))
+            metadata["repos"] = sorted(set(metadata["repos"]) | set(file_metadata["repos"]))
+            metadata["categories"] = sorted(
+                set(metadata["categories"]) | set(file_metadata["categories"])
+            )
+            if file_metadata["since"] and file_metadata["since"] < metadata["since"]:
+                metadata["since"] = file_metadata["since"]
+        for state, positions in saved["durations"].items():
+            for position, data in positions.items():
+                durations[state][position].merge(
+                    DurationSketches.from_dict(data, category_fn)
+                )
+    return durations, metadata
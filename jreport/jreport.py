@@ -5,9 +5,9 @@ import string
 
 import colors
 import dateutil.parser
-import requests
 from urlobject import URLObject
 import yaml
+from .cache import get_json
 from .util import paginated_get
 
 
@@ -36,16 +36,18 @@ class JObj(object):
     def __contains__(self, item):
         return item in self.obj
 
-    def format(self, fmt):
-        return string.Formatter().vformat(fmt, (), JFormatObj(self.obj))
+    def format(self, fmt, plain=False):
+        """Format with `fmt`.  If `plain`, color and style specs are ignored."""
+        return string.Formatter().vformat(fmt, (), JFormatObj(self.obj, plain))
 
     def pprint(self):
         pprint.pprint(self.obj)
 
 
 class JFormatObj(object):
-    def __init__(self, obj):
+    def __init__(self, obj, plain=False):
         self.obj = obj
+        self.plain = plain
 
     def __repr__(self):
         return u"jreport.{cls}({obj!r})".format(
@@ -57,13 +59,14 @@ class JFormatObj(object):
             return ""
         if key.startswith("'"):
             return key.strip("'")
-        return Formattable(self.obj[key])
+        return Formattable(self.obj[key], self.plain)
 
 
 @functools.total_ordering
 class Formattable(object):
-    def __init__(self, v):
+    def __init__(self, v, plain=False):
         self.v = v
+        self.plain = plain
 
     def __repr__(self):
         return u"jreport.{cls}({v!r})".format(
@@ -80,33 +83,80 @@ class Formattable(object):
         return str(self.v)
 
     def __getattr__(self, a):
-        return Formattable(self.v[a])
+        return Formattable(self.v[a], self.plain)
 
     def __format__(self, spec):
         v = self.v
-        for spec in spec.split(':'):
-            try:
-                v = format(v, spec)
-            except ValueError:
-                # Hmm, must be a custom one.
-                if spec.startswith("%"):
-                    v = format(dateutil.parser.parse(v), spec)
-                elif spec in colors.COLORS:
-                    v = colors.color(unicode(v), fg=spec)
-                elif spec in colors.STYLES:
-                    v = colors.color(v, style=spec)
-                elif spec == "ago":
-                    v = ago(v)
-                elif spec == "oneline":
-                    v = " ".join(v.split())
-                elif spec == "pad":
-                    v = " " + v + " "
-                elif spec == "spacejoin":
-                    v = " ".join(v)
-                else:
-                    raise Exception("Don't know formatting {!r}".format(spec))
+        for step in compile_spec(spec, self.plain):
+            v = step(v)
         return v
 
+
+# ANSI codes for the color and style names that can be used in specs.
+STYLE_CODES = {}
+for i, name in enumerate(colors.COLORS):
+    STYLE_CODES[name] = str(30 + i)
+for i, name in enumerate(colors.STYLES):
+    STYLE_CODES[name] = str(i)
+STYLE_RESET = "\x1b[0m"
+
+CUSTOM_FORMATS = {
+    "ago": lambda v: ago(v),
+    "oneline": lambda v: " ".join(v.split()),
+    "pad": lambda v: " " + v + " ",
+    "spacejoin": lambda v: " ".join(v),
+}
+
+_compiled_specs = {}
+
+def compile_spec(spec, plain=False):
+    """
+    Turn a colon-separated format spec into a list of functions to apply.
+
+    Color and style names are resolved to escape sequences here, once per
+    distinct spec, and a run of them becomes a single prefix.  If `plain`,
+    they are dropped altogether.
+    """
+    key = (spec, plain)
+    if key not in _compiled_specs:
+        steps = []
+        codes = []
+        for part in spec.split(':'):
+            if part in STYLE_CODES:
+                codes.append(STYLE_CODES[part])
+                continue
+            if codes:
+                if not plain:
+                    steps.append(styler(codes))
+                codes = []
+            if part in CUSTOM_FORMATS:
+                steps.append(CUSTOM_FORMATS[part])
+            else:
+                steps.append(formatter(part))
+        if codes and not plain:
+            steps.append(styler(codes))
+        if not steps:
+            # A plain spec of only colors still has to produce a string.
+            steps.append(formatter(""))
+        _compiled_specs[key] = steps
+    return _compiled_specs[key]
+
+def styler(codes):
+    prefix = "\x1b[{}m".format(";".join(codes))
+    def style(v):
+        return u"{}{}{}".format(prefix, v, STYLE_RESET)
+    return style
+
+def formatter(spec):
+    def format_it(v):
+        try:
+            return format(v, spec)
+        except ValueError:
+            if spec.startswith("%"):
+                return format(dateutil.parser.parse(v), spec)
+            raise Exception("Don't know formatting {!r}".format(spec))
+    return format_it
+
 def english_units(num, unit, brief):
     if brief:
         return "{num}{unit}".format(num=num, unit=unit[0])
@@ -135,7 +185,7 @@ def ago(v, detail=2, brief=True):
 
 
 class JReport(object):
-    def __init__(self, debug=""):
+    def __init__(self, debug="", use_cache=True):
         # If there's an auth.yaml, use it!
         self.auth = {}
         try:
@@ -147,6 +197,7 @@ class JReport(object):
                 self.auth = yaml.load(auth_file)
 
         self.debug = debug or ""
+        self.use_cache = use_cache
         if "http" in self.debug:
             # Yuck, but this is what requests says to do.
             import httplib
@@ -168,9 +219,11 @@ class JReport(object):
         debug = ("json" in self.debug)
         return [JObj(item) for item in paginated_get(url, debug=debug, auth=auth)]
 
-    def get_json_object(self, url, auth=None, params=None):
+    def get_json_object(self, url, auth=None, params=None, use_cache=None):
+        if use_cache is None:
+            use_cache = self.use_cache
         url, auth = self._prep(url, auth, params)
-        result = requests.get(url, auth=auth).json()
+        result = get_json(url, auth=auth, use_cache=use_cache)
         if "json" in self.debug:
             pprint.pprint(result)
         return JObj(result)
@@ -0,0 +1,194 @@
+"""
+Record and replay GitHub API traffic.
+
+A run can be recorded into a snapshot file, and later runs can replay the
+snapshot instead of talking to the network.  This makes report runs
+repeatable, and fast enough to benchmark formatting and analysis changes
+with realistic data.
+
+Snapshots are gzipped JSON.  Each response body is split into its JSON
+objects, and each distinct object is stored once, keyed by its hash, so a
+pull request that appears on many pages or in many listings costs little.
+
+Responses are found by URL.  Reports usually ask for issues updated "since"
+some days ago, so if a URL isn't in the snapshot exactly, one that differs
+only in its "since" parameter will be used instead, with a note on stderr,
+since the data may cover a different window than was asked for.
+"""
+from __future__ import print_function
+
+import gzip
+import hashlib
+import json
+import sys
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from urlobject import URLObject
+
+
+# Only the headers we actually use are kept in the snapshot.
+RECORDED_HEADERS = ("link",)
+
+# The snapshot currently recording or replaying, if any.
+_active = None
+
+
+def http_get(url, **kwargs):
+    """
+    Like `requests.get`, but recorded or replayed by the active snapshot.
+    """
+    if _active:
+        return _active.get(url, **kwargs)
+    return requests.get(url, **kwargs)
+
+
+class SnapshotResponse(object):
+    """Enough of a `requests.Response` to satisfy our API calls."""
+    def __init__(self, url, status_code, headers, body):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self._body = body
+
+    def __repr__(self):
+        return u"jreport.{cls}({url!r}, {status!r})".format(
+            cls=self.__class__.__name__, url=self.url, status=self.status_code,
+        )
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        # Decode fresh objects each time, so callers can modify them freely.
+        return self._body()
+
+
+class Snapshot(object):
+    """
+    A recording of HTTP exchanges.
+
+    `mode` is "record" to fetch from the network and save what was seen,
+    "replay" to serve responses from `filename` without any network, or
+    None to do neither.  Use it as a context manager around the run::
+
+        with Snapshot("edx.snap.gz", "record"):
+            show_pulls(...)
+
+    """
+    def __init__(self, filename=None, mode=None):
+        assert mode in (None, "record", "replay")
+        self.filename = filename
+        self.mode = mode
+        self.exchanges = {}
+        self.blobs = {}
+        self._loose_urls = None
+        if mode == "replay":
+            self.load()
+
+    def __repr__(self):
+        return u"jreport.{cls}({filename!r}, {mode!r})".format(
+            cls=self.__class__.__name__, filename=self.filename, mode=self.mode,
+        )
+
+    def __enter__(self):
+        global _active
+        if self.mode:
+            _active = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _active
+        if self.mode:
+            _active = None
+            if self.mode == "record":
+                self.save()
+
+    def get(self, url, **kwargs):
+        if self.mode == "replay":
+            return self.replay(url)
+        resp = requests.get(url, **kwargs)
+        if self.mode == "record":
+            self.record(url, resp)
+        return resp
+
+    def _store(self, obj):
+        text = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        self.blobs[key] = text
+        return key
+
+    def record(self, url, resp):
+        result = resp.json()
+        if isinstance(result, list):
+            body = [self._store(item) for item in result]
+        else:
+            body = self._store(result)
+        self.exchanges[str(url)] = {
+            "status": resp.status_code,
+            "headers": {
+                h: resp.headers[h] for h in RECORDED_HEADERS if h in resp.headers
+            },
+            "body": body,
+        }
+
+    def replay(self, url):
+        exchange = self.exchanges.get(str(url))
+        if exchange is None:
+            loose_url = self._loose_url(url)
+            if loose_url is not None:
+                print("Replaying {loose} for {url}".format(loose=loose_url, url=url), file=sys.stderr)
+                exchange = self.exchanges[loose_url]
+        if exchange is None:
+            raise requests.exceptions.RequestException(
+                "{url} is not in snapshot {filename}".format(url=url, filename=self.filename)
+            )
+        body = exchange["body"]
+        if isinstance(body, list):
+            texts = [self.blobs[key] for key in body]
+            decode = lambda: [json.loads(text) for text in texts]
+        else:
+            text = self.blobs[body]
+            decode = lambda: json.loads(text)
+        return SnapshotResponse(url, exchange["status"], exchange["headers"], decode)
+
+    def _loose_url(self, url):
+        """Find a recorded URL matching `url` apart from its "since" parameter."""
+        if self._loose_urls is None:
+            self._loose_urls = {}
+            for recorded in self.exchanges:
+                loose = URLObject(recorded).del_query_param("since")
+                self._loose_urls.setdefault(loose, recorded)
+        return self._loose_urls.get(URLObject(url).del_query_param("since"))
+
+    def load(self):
+        with gzip.open(self.filename, "rb") as f:
+            data = json.loads(f.read().decode("utf-8"))
+        self.exchanges = data["exchanges"]
+        self.blobs = data["blobs"]
+
+    def save(self):
+        data = {"exchanges": self.exchanges, "blobs": self.blobs}
+        with gzip.open(self.filename, "wb") as f:
+            f.write(json.dumps(data).encode("utf-8"))
+
+
+def add_snapshot_args(parser):
+    """Add --record and --replay options to an argparse parser."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="FILE",
+        help="Record all GitHub API traffic to a snapshot FILE",
+    )
+    group.add_argument("--replay", metavar="FILE",
+        help="Use a snapshot FILE instead of the GitHub API",
+    )
+
+
+def snapshot_from_args(args):
+    """Make a `Snapshot` from the options added by `add_snapshot_args`."""
+    if args.record:
+        return Snapshot(args.record, "record")
+    if args.replay:
+        return Snapshot(args.replay, "replay")
+    return Snapshot()
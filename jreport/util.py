@@ -3,6 +3,8 @@ import re
 import requests
 import pprint
 
+from .snapshot import http_get
+
 
 def paginated_get(url, debug=False, **kwargs):
     """
@@ -11,7 +13,7 @@ def paginated_get(url, debug=False, **kwargs):
     Github's v3 API.
     """
     while url:
-        resp = requests.get(url, **kwargs)
+        resp = http_get(url, **kwargs)
         result = resp.json()
         if not resp.ok:
             raise requests.exceptions.RequestException(result["message"])
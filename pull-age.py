@@ -7,11 +7,14 @@ import sys
 import yaml
 
 from datetime import date, datetime, timedelta
-from backports import statistics
 
 import iso8601
 from urlobject import URLObject
 
+from jreport.durations import (
+    load_duration_sketches, new_duration_sketches, save_duration_sketches,
+)
+from jreport.snapshot import add_snapshot_args, snapshot_from_args
 from jreport.util import paginated_get
 
 DEBUG = False
@@ -52,6 +55,9 @@ def get_duration_data(
     """
     Update `durations`, a dict of dict of lists of pull requests.
 
+    Each list only needs an `append` method, so a `DurationSketches` can be
+    used in place of a list to summarize the durations in constant memory.
+
     `durations` has four lists of data, where each list contains only timedelta objects:
       age of internal open pull requests (all)
       age of external open pull requests (all)
@@ -123,44 +129,74 @@ def main(argv):
     parser.add_argument("--org", action="store_true",
         help="Break down by organization"
     )
+    parser.add_argument("--save", metavar="FILE",
+        help="Save the duration sketches to FILE, for merging later with --load"
+    )
+    parser.add_argument("--load", metavar="FILE", nargs="+",
+        help="Report on previously saved sketches instead of querying GitHub. "
+             "--since is taken from the saved files, and --org must match them. "
+             "Files from different days count a pull request once for each day it was seen."
+    )
+    add_snapshot_args(parser)
     args = parser.parse_args(argv[1:])
 
-    since = None
-    if args.since:
-        since = date.today() - timedelta(days=args.since)
-
-    internal_usernames = get_internal_usernames()
-    user_org_mapping = get_user_org_mapping()
-
     if args.org:
-        categories = sorted(set(user_org_mapping.values()))
-        def cat_filter(cat, pr):
-            return pr['org'] == cat
+        def category_fn(pr):
+            return pr['org']
+    else:
+        category_fn = None
+
+    if args.load:
+        if args.record or args.replay:
+            parser.error("--load reads saved sketches, it can't be used with --record or --replay")
+        try:
+            durations, metadata = load_duration_sketches(args.load, category_fn)
+        except ValueError as err:
+            parser.error(str(err))
+        if metadata["org"] != args.org:
+            parser.error("The saved sketches were made {}--org".format("with " if metadata["org"] else "without "))
     else:
-        categories = ["all"]
-        def cat_filter(cat, pr):
-            return True
-
-    durations = {
-        "open": {
-            "internal": [],
-            "external": [],
-        },
-        "closed": {
-            "internal": [],
-            "external": [],
+        since = None
+        if args.since:
+            since = date.today() - timedelta(days=args.since)
+
+        internal_usernames = get_internal_usernames()
+        user_org_mapping = get_user_org_mapping()
+        if args.org:
+            categories = sorted(set(user_org_mapping.values()))
+        else:
+            categories = ["all"]
+
+        durations = new_duration_sketches(category_fn)
+        with snapshot_from_args(args):
+            for owner, repo, label in REPOS:
+                get_duration_data(durations, owner, repo, since, label, internal_usernames, user_org_mapping)
+
+        repos = ["{}/{}".format(owner, repo) for owner, repo, _ in REPOS]
+        metadata = {
+            "since_days": args.since,
+            "since": since.isoformat() if since else None,
+            "dates": [date.today().isoformat()],
+            "repos": repos,
+            "runs": [[date.today().isoformat(), repo] for repo in repos],
+            "org": args.org,
+            "categories": categories,
         }
-    }
-    for owner, repo, label in REPOS:
-        get_duration_data(durations, owner, repo, since, label, internal_usernames, user_org_mapping)
+
+    if args.save:
+        save_duration_sketches(args.save, durations, metadata)
+
+    categories = metadata["categories"]
+    since = metadata["since"]
+    when = datetime.strptime(metadata["dates"][-1], "%Y-%m-%d")
 
     for linenum, cat in enumerate(categories):
         ss_friendly = []
         for position in ("external", "internal"):
             for state in ("open", "closed"):
-                seconds = [p['duration'].total_seconds() for p in durations[state][position] if cat_filter(cat, p)]
-                if seconds:
-                    median_seconds = int(statistics.median(seconds))
+                sketch = durations[state][position][cat]
+                if sketch.count:
+                    median_seconds = int(sketch.median())
                     median_duration = timedelta(seconds=median_seconds)
                 else:
                     median_seconds = -1
@@ -169,18 +205,25 @@ def main(argv):
                 if state == "closed" and since:
                     population = "since {date}".format(date=since)
                 if args.human:
+                    p90, p99 = sketch.quantiles([0.9, 0.99])
+                    if sketch.count:
+                        median_duration = "{median} (p90 {p90}, p99 {p99})".format(
+                            median=median_duration,
+                            p90=timedelta(seconds=int(p90)),
+                            p99=timedelta(seconds=int(p99)),
+                        )
                     print("median {position} {state} ({population}): {duration}".format(
                         position=position, state=state, population=population,
                         duration=median_duration
                     ))
                 else:
-                    ss_friendly += [len(seconds), median_seconds]
+                    ss_friendly += [sketch.count, median_seconds]
 
         if ss_friendly:
             if linenum == 0:
                 print("cat\twhen\trepos\teopen\teopenage\teclosed\teclosedage\tiopen\tiopenage\ticlosed\ticlosedage")
             ss_data = "\t".join(str(x) for x in ss_friendly)
-            print("{}\t{:%m/%d/%Y}\t{}\t{}".format(cat, date.today(), len(REPOS), ss_data))
+            print("{}\t{:%m/%d/%Y}\t{}\t{}".format(cat, when, len(metadata["repos"]), ss_data))
 
 if __name__ == "__main__":
     main(sys.argv)
@@ -10,11 +10,13 @@ import sys
 
 import dateutil.parser
 from pymongo import MongoClient
-import requests
 from urlobject import URLObject
 import yaml
 
 import jreport
+from jreport.aggregate import Count, Each, Histogram, Query, Sum
+from jreport.cache import get_json, object_cache
+from jreport.snapshot import add_snapshot_args, snapshot_from_args
 from jreport.util import paginated_get
 
 ISSUE_FMT = (
@@ -36,7 +38,7 @@ class JPullRequest(jreport.JObj):
             self['org'] = org_fn(self)
 
     def finish_loading(self):
-        self['pull'] = requests.get(self._pr_url).json()
+        self['pull'] = get_json(self._pr_url)
 
         if self['state'] == 'open':
             self['combinedstate'] = 'open'
@@ -99,7 +101,7 @@ def get_pulls(labels=None, state="open", since=None, org=False):
     return issues
 
 
-def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False):
+def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False, plain=False):
     issues = get_pulls(labels, state, since, org)
 
     category = None
@@ -113,7 +115,7 @@ def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None,
         if 0:
             import pprint
             pprint.pprint(issue.obj)
-        print(issue.format(ISSUE_FMT))
+        print(issue.format(ISSUE_FMT, plain=plain))
 
         if show_comments:
             comments_url = URLObject(issue['comments_url'])
@@ -122,7 +124,7 @@ def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None,
             comments = paginated_get(comments_url)
             last_five_comments = reversed(more_itertools.take(5, comments))
             for comment in last_five_comments:
-                print(comment.format(COMMENT_FMT))
+                print(comment.format(COMMENT_FMT, plain=plain))
 
     # index is now set to the total number of pull requests
     print()
@@ -150,42 +152,65 @@ if 0:
     def yearmonth(d):
         return dateutil.parser.parse(d).strftime("%Y%m")
 
-    def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False):
-        months = collections.defaultdict(lambda: {'opened': 0, 'merged': 0})
-        issues = get_pulls(labels, state, since, org)
-        for issue in issues:
-            issue.finish_loading()
-            months[yearmonth(issue['created_at'])]['opened'] += 1
+    def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False, plain=False):
+        def loaded(issues):
+            for issue in issues:
+                issue.finish_loading()
+                yield issue
+
+        def merged_month(issue):
             if issue['pull.merged']:
-                months[yearmonth(issue['pull.merged_at'])]['merged'] += 1
+                return yearmonth(issue['pull.merged_at'])
 
-        print(months)
-        for ym, data in sorted(months.items()):
-            print("{ym},{data[opened]},{data[merged]}".format(ym=ym, data=data))
+        query = Query(
+            opened=Histogram(lambda issue: yearmonth(issue['created_at'])),
+            merged=Histogram(merged_month),
+        )
+        counts = query.run(loaded(get_pulls(labels, state, since, org)))
+
+        print(counts)
+        for ym in sorted(set(counts['opened']) | set(counts['merged'])):
+            print("{ym},{opened},{merged}".format(
+                ym=ym, opened=counts['opened'].get(ym, 0), merged=counts['merged'].get(ym, 0),
+            ))
 
 if 0:
     # The wall of shame
-    def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False):
-        issues = get_pulls(state="open")
-        blocked_by = collections.defaultdict(list)
-        for issue in issues:
-            issue.finish_loading()
-            for label in issue['labels']:
-                if label == "osc":
-                    continue
-                blocked_by[label].append(issue)
+    def show_pulls(jrep, labels=None, show_comments=False, state="open", since=None, org=False, plain=False):
+        def loaded(issues):
+            for issue in issues:
+                issue.finish_loading()
+                yield issue
+
+        def blocking_labels(issue):
+            return [label for label in issue['labels'] if label != "osc"]
+
+        def is_external(issue):
+            return "osc" in issue['labels']
+
+        query = Query(
+            group_by=[Each(blocking_labels), is_external],
+            prs=Count(),
+            lines=Sum(lambda issue: issue['pull.additions'] + issue['pull.deletions']),
+        )
+        totals = query.run(loaded(get_pulls(state="open")))
+
+        no_prs = {'prs': 0, 'lines': 0}
+        blocked_by = collections.defaultdict(dict)
+        for (label, external), stats in totals.items():
+            blocked_by[label][external] = stats
 
-        shame = sorted(blocked_by.items(), key=lambda li: len(li[1]), reverse=True)
+        shame = sorted(
+            blocked_by.items(),
+            key=lambda li: sum(stats['prs'] for stats in li[1].values()),
+            reverse=True,
+        )
         print("team,external,internal,extlines,intlines")
-        for label, issues in shame:
-            internal, external = [0, 0], [0, 0]
-            for iss in issues:
-                lines = iss['pull.additions'] + iss['pull.deletions']
-                stats = external if "osc" in iss['labels'] else internal
-                stats[0] += 1
-                stats[1] += lines
+        for label, stats in shame:
+            external = stats.get(True, no_prs)
+            internal = stats.get(False, no_prs)
             print("{}\t{}\t{}\t{}\t{}".format(
-                label, external[0], internal[0], external[1], internal[1]
+                label, external['prs'], internal['prs'], external['lines'], internal['lines']
             ))
 
 def main(argv):
@@ -200,14 +225,18 @@ def main(argv):
         help="Also show 5 most recent comments",
         )
     parser.add_argument("--debug",
-        help="See what's going on.  DEBUG=http or json are fun.",
+        help="See what's going on.  DEBUG=http, json or cache are fun.",
         )
     parser.add_argument("--org", action='store_true',
         help="Include and sort by affiliation",
         )
+    parser.add_argument("--plain", action='store_true',
+        help="Don't use colors or styles in the output",
+        )
     parser.add_argument("--since", metavar="DAYS", type=int,
         help="Include pull requests active in the last DAYS days.",
         )
+    add_snapshot_args(parser)
 
     args = parser.parse_args(argv[1:])
 
@@ -225,14 +254,18 @@ def main(argv):
         since = datetime.datetime.now() - datetime.timedelta(days=args.since)
 
     jrep = jreport.JReport(debug=args.debug)
-    show_pulls(
-        jrep,
-        labels=labels,
-        show_comments=args.show_comments,
-        state=state,
-        since=since,
-        org=args.org,
-    )
+    with snapshot_from_args(args):
+        show_pulls(
+            jrep,
+            labels=labels,
+            show_comments=args.show_comments,
+            state=state,
+            since=since,
+            org=args.org,
+            plain=args.plain,
+        )
+    if "cache" in jrep.debug:
+        object_cache.print_stats()
 
 
 if __name__ == "__main__":
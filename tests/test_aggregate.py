@@ -0,0 +1,68 @@
+import unittest
+
+from jreport import JObj
+from jreport.aggregate import Count, Each, Histogram, Median, Query, Sum
+
+
+PULLS = [
+    JObj({'org': 'edX', 'labels': ['osc', 'docs'], 'pull': {'additions': 10, 'merged': True}}),
+    JObj({'org': 'edX', 'labels': ['docs'], 'pull': {'additions': 5, 'merged': False}}),
+    JObj({'org': 'other', 'labels': ['osc'], 'pull': {'additions': 1, 'merged': True}}),
+]
+
+
+class TestQuery(unittest.TestCase):
+
+    def test_group_by_dotted_path(self):
+        query = Query(group_by="pull.merged", n=Count(), lines=Sum("pull.additions"))
+        self.assertEqual(query.run(PULLS), {
+            True: {'n': 2, 'lines': 11},
+            False: {'n': 1, 'lines': 5},
+        })
+
+    def test_no_grouping(self):
+        query = Query(where=lambda pr: pr['org'] == 'edX', n=Count(), med=Median("pull.additions"))
+        self.assertEqual(query.run(PULLS), {'n': 2, 'med': 7.5})
+        self.assertEqual(query.run([]), {'n': 0, 'med': None})
+        for group_by in [None, "", [], ()]:
+            query = Query(group_by=group_by, n=Count())
+            self.assertEqual(query.run(PULLS), {'n': 3})
+
+    def test_median_interpolates(self):
+        query = Query(med=Median("pull.additions"))
+        self.assertEqual(query.run(PULLS), {'med': 5})
+        self.assertEqual(query.run(PULLS[:2]), {'med': 7.5})
+
+    def test_each_and_histogram(self):
+        query = Query(group_by=[Each("labels")], orgs=Histogram("org"))
+        self.assertEqual(query.run(PULLS), {
+            ('osc',): {'orgs': {'edX': 1, 'other': 1}},
+            ('docs',): {'orgs': {'edX': 2}},
+        })
+
+    def test_histogram_buckets(self):
+        buckets = [("small", 0, 5), ("big", 5, 100)]
+        query = Query(sizes=Histogram("pull.additions", buckets))
+        self.assertEqual(query.run(PULLS), {'sizes': {'small': 1, 'big': 2}})
+
+    def test_partitions_merge(self):
+        query = Query(group_by="org", n=Count(), lines=Sum("pull.additions"))
+        partitions = [PULLS[:1], PULLS[1:], []]
+        expected = query.run(PULLS)
+        self.assertEqual(query.run_partitions(partitions), expected)
+        self.assertEqual(query.run_partitions(partitions, threads=2), expected)
+
+    def test_merging_leaves_partials_alone(self):
+        query = Query(
+            group_by="org", n=Count(), med=Median("pull.additions"), orgs=Histogram("org"),
+        )
+        p1, p2 = query.partial(PULLS[:1]), query.partial(PULLS[1:])
+        first = query.finish(query.merge([p1, p2]))
+        self.assertEqual(query.finish(query.merge([p1, p2])), first)
+        self.assertEqual(first["edX"]["n"], 2)
+        self.assertEqual(query.finish(p1), {'edX': {'n': 1, 'med': 10, 'orgs': {'edX': 1}}})
+
+    def test_each_needs_a_list(self):
+        query = Query(group_by=[Each("org")], n=Count())
+        with self.assertRaises(TypeError):
+            query.run(PULLS)
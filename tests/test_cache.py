@@ -0,0 +1,91 @@
+import unittest
+
+from jreport import cache
+from jreport.cache import ObjectCache, get_json
+
+
+class FakeResponse(object):
+    def __init__(self, result, ok=True):
+        self.result = result
+        self.ok = ok
+
+    def json(self):
+        return self.result
+
+
+class TestObjectCache(unittest.TestCase):
+
+    def test_hits_and_misses(self):
+        cache = ObjectCache()
+        self.assertIsNone(cache.get("https://x/pulls/1"))
+        cache.put("https://x/pulls/1", {'merged': True})
+        self.assertEqual(cache.get("https://x/pulls/1"), {'merged': True})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.hit_rate, 0.5)
+
+    def test_hits_are_copies(self):
+        cache = ObjectCache()
+        cache.put("u", {'a': 1})
+        cache.get("u")['a'] = 2
+        self.assertEqual(cache.get("u"), {'a': 1})
+
+    def test_lru_eviction_by_size(self):
+        cache = ObjectCache(max_bytes=25)
+        cache.put("a", "x" * 8)
+        cache.put("b", "y" * 8)
+        cache.get("a")
+        cache.put("c", "z" * 8)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.size, 25)
+
+
+class TestGetJson(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.responses = {}
+        self.old_http_get = cache.http_get
+        self.old_object_cache = cache.object_cache
+        cache.http_get = self.fake_http_get
+        cache.object_cache = ObjectCache()
+
+    def tearDown(self):
+        cache.http_get = self.old_http_get
+        cache.object_cache = self.old_object_cache
+
+    def fake_http_get(self, url, **kwargs):
+        self.requests.append((url, kwargs.get('auth')))
+        return self.responses[url]
+
+    def test_second_call_is_cached(self):
+        self.responses["u"] = FakeResponse({'a': 1})
+        self.assertEqual(get_json("u"), {'a': 1})
+        self.assertEqual(get_json("u"), {'a': 1})
+        self.assertEqual(len(self.requests), 1)
+
+    def test_failures_arent_cached(self):
+        self.responses["u"] = FakeResponse({'message': 'Not Found'}, ok=False)
+        get_json("u")
+        get_json("u")
+        self.assertEqual(len(self.requests), 2)
+        self.assertNotIn("u", cache.object_cache)
+
+    def test_auth_is_part_of_the_key(self):
+        self.responses["u"] = FakeResponse({'a': 1})
+        get_json("u", auth=("ned", "secret"))
+        get_json("u", auth=("ned", "secret"))
+        get_json("u")
+        get_json("u", auth=("other", "secret"))
+        self.assertEqual(self.requests, [
+            ("u", ("ned", "secret")), ("u", None), ("u", ("other", "secret")),
+        ])
+
+    def test_use_cache_false(self):
+        self.responses["u"] = FakeResponse({'a': 1})
+        get_json("u", use_cache=False)
+        get_json("u", use_cache=False)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(len(cache.object_cache), 0)
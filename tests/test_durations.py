@@ -0,0 +1,117 @@
+import datetime
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from jreport.durations import (
+    DurationSketches, QuantileSketch,
+    load_duration_sketches, new_duration_sketches, save_duration_sketches,
+)
+
+
+class TestQuantileSketch(unittest.TestCase):
+
+    def test_small_sketch_is_exact(self):
+        sk = QuantileSketch()
+        sk.update([5, 1, 4, 2, 3])
+        self.assertEqual(sk.count, 5)
+        self.assertEqual(sk.median(), 3)
+        self.assertEqual(sk.quantiles([0, 1]), [1, 5])
+
+    def test_small_sketch_interpolates(self):
+        sk = QuantileSketch()
+        sk.update([4, 1, 3, 2])
+        self.assertEqual(sk.median(), 2.5)
+        self.assertEqual(sk.quantile(0.25), 1.75)
+
+    def test_empty_sketch(self):
+        self.assertEqual(QuantileSketch().median(), None)
+
+    def test_bounded_memory_and_error(self):
+        values = list(range(100000))
+        random.Random(17).shuffle(values)
+        sk = QuantileSketch(k=200)
+        sk.update(values)
+        self.assertLess(sum(len(c) for c in sk.compactors), 1000)
+        for q in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(sk.quantile(q) / 100000.0, q, delta=0.02)
+
+    def test_merge_and_serialize(self):
+        a, b = QuantileSketch(), QuantileSketch()
+        a.update(range(0, 5000))
+        b.update(range(5000, 10000))
+        merged = QuantileSketch.from_dict(a.to_dict()).merge(b)
+        self.assertEqual(merged.count, 10000)
+        self.assertEqual((merged.min, merged.max), (0, 9999))
+        self.assertAlmostEqual(merged.median() / 10000.0, 0.5, delta=0.02)
+
+
+class TestDurationSketches(unittest.TestCase):
+
+    def test_append_issues(self):
+        sketches = DurationSketches(lambda issue: issue['org'])
+        for org, hours in [("edX", 1), ("edX", 3), ("other", 10)]:
+            sketches.append({'org': org, 'duration': datetime.timedelta(hours=hours)})
+        self.assertEqual(sketches.categories(), ["edX", "other"])
+        self.assertEqual(sketches["edX"].count, 2)
+        self.assertEqual(sketches["other"].median(), 36000)
+
+
+class TestSavedDurations(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def save(self, name, hours, **metadata):
+        durations = new_duration_sketches()
+        for h in hours:
+            durations["closed"]["external"].append({'duration': datetime.timedelta(hours=h)})
+        full_metadata = {
+            "since_days": 14, "since": "2014-06-01", "dates": ["2014-06-15"],
+            "repos": ["edx/edx-platform"], "org": False, "categories": ["all"],
+        }
+        full_metadata.update(metadata)
+        filename = os.path.join(self.tmpdir, name)
+        save_duration_sketches(filename, durations, full_metadata)
+        return filename
+
+    def test_round_trip_and_merge(self):
+        day1 = self.save("day1.json", [1, 2, 3])
+        day2 = self.save("day2.json", [4, 5], since="2014-06-02", dates=["2014-06-16"])
+
+        durations, metadata = load_duration_sketches([day1])
+        sketch = durations["closed"]["external"]["all"]
+        self.assertEqual(sketch.count, 3)
+        self.assertEqual(sketch.median(), 7200)
+        self.assertEqual(durations["open"]["internal"]["all"].count, 0)
+
+        durations, metadata = load_duration_sketches([day1, day2])
+        sketch = durations["closed"]["external"]["all"]
+        self.assertEqual(sketch.count, 5)
+        self.assertEqual(sketch.median(), 3 * 3600)
+        self.assertEqual(metadata["dates"], ["2014-06-15", "2014-06-16"])
+        self.assertEqual(metadata["since"], "2014-06-01")
+
+    def test_mismatched_files_dont_merge(self):
+        day1 = self.save("day1.json", [1])
+        org = self.save("org.json", [1], org=True, dates=["2014-06-16"])
+        with self.assertRaises(ValueError):
+            load_duration_sketches([day1, org])
+
+    def test_merge_repos(self):
+        platform = self.save("platform.json", [1, 2])
+        config = self.save("config.json", [3], repos=["edx/configuration"])
+        durations, metadata = load_duration_sketches([platform, config])
+        self.assertEqual(durations["closed"]["external"]["all"].count, 3)
+        self.assertEqual(metadata["repos"], ["edx/configuration", "edx/edx-platform"])
+        self.assertEqual(len(metadata["runs"]), 2)
+
+    def test_same_day_and_repo_dont_merge(self):
+        day1 = self.save("day1.json", [1])
+        with self.assertRaises(ValueError):
+            load_duration_sketches([day1, day1])
@@ -26,3 +26,13 @@ class TestIt(unittest.TestCase):
     def test_subobject_formatting(self):
         jo = JObj({'a': {'b': 23}, 'c': 45})
         self.assertEqual(jo.format("{a.b:5d}!"), "   23!")
+
+    def test_color_formatting(self):
+        jo = JObj({'a':17, 'b':'hi'})
+        self.assertEqual(jo.format("{a:3d:red}"), "\x1b[31m 17\x1b[0m")
+        self.assertEqual(jo.format("{b:pad:green:bold}!"), "\x1b[32;1m hi \x1b[0m!")
+
+    def test_plain_formatting(self):
+        jo = JObj({'a':17, 'b':'hi'})
+        self.assertEqual(jo.format("{a:3d:red}|{b:pad:green:bold}", plain=True), " 17| hi ")
+        self.assertEqual(jo.format("{a:red}+{a:green:bold}", plain=True), "17+17")
@@ -0,0 +1,78 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from jreport.cache import get_json
+from jreport.snapshot import Snapshot
+from jreport.util import paginated_get
+
+
+class FakeResponse(object):
+    def __init__(self, result, headers=None, status_code=200):
+        self.result = result
+        self.headers = headers or {}
+        self.status_code = status_code
+
+    def json(self):
+        return self.result
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.snap.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_record_and_replay(self):
+        pr = {'number': 17, 'title': 'Fix it'}
+        snap = Snapshot(self.filename, "record")
+        snap.record("https://x/issues?page=1", FakeResponse([pr], {'link': '<https://x/issues?page=2>; rel="next"'}))
+        snap.record("https://x/issues?page=2", FakeResponse([pr, {'number': 18}]))
+        snap.record("https://x/pulls/17", FakeResponse({'merged': True}))
+        snap.save()
+        # The PR on both pages is only stored once.
+        self.assertEqual(len(snap.blobs), 3)
+
+        replay = Snapshot(self.filename, "replay")
+        resp = replay.get("https://x/issues?page=1")
+        self.assertTrue(resp.ok)
+        self.assertEqual(resp.json(), [pr])
+        self.assertIn("page=2", resp.headers['Link'])
+        self.assertEqual(replay.get("https://x/pulls/17").json(), {'merged': True})
+
+    def test_replay_ignores_since(self):
+        snap = Snapshot(self.filename, "record")
+        snap.record("https://x/issues?state=closed&since=2014-01-01", FakeResponse([]))
+        snap.save()
+        replay = Snapshot(self.filename, "replay")
+        old_stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            resp = replay.get("https://x/issues?state=closed&since=2014-02-02")
+            stderr = sys.stderr.getvalue()
+        finally:
+            sys.stderr = old_stderr
+        self.assertEqual(resp.json(), [])
+        self.assertIn("since=2014-01-01 for ", stderr)
+
+    def test_replay_through_http_get(self):
+        snap = Snapshot(self.filename, "record")
+        snap.record("https://x/issues?page=1", FakeResponse([{'number': 1}], {'link': '<https://x/issues?page=2>; rel="next"'}))
+        snap.record("https://x/issues?page=2", FakeResponse([{'number': 2}]))
+        snap.record("https://x/pulls/2", FakeResponse({'merged': True}))
+        snap.save()
+
+        with Snapshot(self.filename, "replay"):
+            issues = list(paginated_get("https://x/issues?page=1"))
+            pull = get_json("https://x/pulls/2", use_cache=False)
+        self.assertEqual(issues, [{'number': 1}, {'number': 2}])
+        self.assertEqual(pull, {'merged': True})
@@ -4,11 +4,12 @@ from __future__ import print_function
 import sys
 import argparse
 from datetime import datetime, timedelta
-from collections import defaultdict
 
 import iso8601
 from urlobject import URLObject
 
+from jreport.aggregate import Histogram, Query
+from jreport.snapshot import add_snapshot_args, snapshot_from_args
 from jreport.util import paginated_get
 
 segments = [
@@ -32,11 +33,10 @@ segments = [
 ]
 
 
-def get_segment(duration):
-    for text, low, high in segments:
-        if low <= duration < high:
-            return text
-    return "unknown"
+def get_duration(issue):
+    created_at = iso8601.parse_date(issue["created_at"])
+    closed_at = iso8601.parse_date(issue["closed_at"])
+    return closed_at - created_at
 
 
 def get_duration_info(since=None, labels=None, pull_requests=False):
@@ -50,18 +50,13 @@ def get_duration_info(since=None, labels=None, pull_requests=False):
     if since:
         url = url.set_query_param('since', since.isoformat())
 
-    counter = defaultdict(list)
-    for issue in paginated_get(url):
-        if pull_requests and not issue['pull_request']['url']:
-            continue
-        num = issue['number']
-        created_at = iso8601.parse_date(issue["created_at"])
-        closed_at = iso8601.parse_date(issue["closed_at"])
-        duration = closed_at - created_at
-        segment = get_segment(duration)
-        counter[segment].append(num)
+    where = None
+    if pull_requests:
+        def where(issue):
+            return issue.get('pull_request', {}).get('url')
 
-    return counter
+    query = Query(where=where, segments=Histogram(get_duration, segments))
+    return query.run(paginated_get(url))["segments"]
 
 
 def main(argv):
@@ -75,6 +70,7 @@ def main(argv):
     parser.add_argument('--pr', '--pull-requests', action='store_true', dest="pull_requests",
         help="Only show issues that are pull requests"
     )
+    add_snapshot_args(parser)
     args = parser.parse_args(argv[1:])
 
     since = None
@@ -85,11 +81,12 @@ def main(argv):
     if not args.all_labels:
         labels.append('open-source-contribution')
 
-    durations = get_duration_info(since, labels, args.pull_requests)
+    with snapshot_from_args(args):
+        durations = get_duration_info(since, labels, args.pull_requests)
 
     for text, _, _ in segments:
-        if durations[text]:
-            print("{text}: {num}".format(text=text, num=len(durations[text])))
+        if durations.get(text):
+            print("{text}: {num}".format(text=text, num=durations[text]))
 
 if __name__ == "__main__":
     main(sys.argv)